@@ -5,18 +5,32 @@ GWU.py (Garmin Weight Uploader)
 - Google Fit CSV 전체를 읽어 Garmin Connect에 업로드
 - 시간 처리: CSV는 KST(+09:00)로 해석, 업로드는 UTC(Z)로 전송
 - 중복 제거: (날짜+시간+체중) 기준 (표시는 KST 기준)
+  업로드한 키는 토큰 디렉터리의 uploaded_keys.json에 기록해 재실행 시 건너뜀
+  Garmin에 이미 있는 측정값도 날짜 범위 조회 1회로 확인해 건너뜀
 - BMI 자동 계산 (신장 174.8cm 고정)
 - '골격근량'이 있으면 muscle_mass로 우선 반영, 없으면 '근육량' 사용
 - 로그인: garminconnect 0.3.2 방식 (저장된 토큰 복원 → 새 로그인)
+- 로그: 기본은 요약만 출력, LOG_LEVEL=DEBUG 이면 행별 로그까지 출력
 """
 
 import argparse
+import codecs
+import fnmatch
 import glob
+import importlib.util
+import inspect
+import json
+import logging
 import os
+import re
 import sys
+import threading
 import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
 import pandas as pd
@@ -27,12 +41,48 @@ from garminconnect import (
     GarminConnectConnectionError,
     GarminConnectTooManyRequestsError,
 )
+from garminconnect.fit import FitEncoderWeight
+from garth.exc import GarthException, GarthHTTPError
+from requests import RequestException
+from requests.adapters import HTTPAdapter, Retry
 from zoneinfo import ZoneInfo
 
+logger = logging.getLogger(__name__)
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 설정
 # ──────────────────────────────────────────────────────────────────────────────
-TOKEN_DIR = str(Path("~/.garminconnect").expanduser())
+TOKEN_DIR = str(Path(os.getenv("GARMINTOKENS", "~/.garminconnect")).expanduser())
+
+# 업로드 완료된 측정값 기록 (토큰 디렉터리와 함께 캐시되어 재실행 시 재업로드 방지)
+STATE_FILE = Path(TOKEN_DIR) / "uploaded_keys.json"
+
+# 업로드 POST는 서버가 기록하지 않은 게 확실한 응답에서만 재시도 (중복 측정값 방지)
+POST_RETRY_STATUS = frozenset({429, 503})
+
+# 업로드 응답 409: 같은 내용이 이미 Garmin에 있음 → 재시도하지 않고 업로드된 것으로 처리
+HTTP_CONFLICT = 409
+
+# 4xx라도 배치 자체의 거부가 아닌 응답 (타임아웃·중복·요청 제한) → 건별 재업로드 대상 아님
+BATCH_NOT_REJECTED_STATUS = frozenset({408, HTTP_CONFLICT, 429})
+
+# 재시도 대기: 지수 백오프에 무작위 지연(초)을 더해 동시 업로드가 한꺼번에 재시도하지 않도록, 최대 30초
+HTTP_BACKOFF_JITTER = 0.5
+HTTP_BACKOFF_MAX = 30.0
+
+# FIT 파일 하나에 묶어서 올릴 최대 측정 건수
+UPLOAD_BATCH_SIZE = 50
+
+# 동시에 업로드할 배치 수 (garth 커넥션 풀 크기 이하, 429 방지를 위해 작게 유지)
+UPLOAD_WORKERS = 4
+
+# CSV 시각은 KST로 해석하고 업로드는 UTC로 (tz 객체는 한 번만 생성해 재사용)
+KST = ZoneInfo("Asia/Seoul")
+UTC = ZoneInfo("UTC")
+
+# 중복 키에 쓰는 KST 날짜/시각 문자열 형식 (시각은 소문자, 앞자리 0 제거: "8:30 am")
+DATE_FMT_KST = "%m/%d/%Y"
+TIME_FMT_KST = "%I:%M %p"
 
 USER_HEIGHT_M = 1.748
 USER_HEIGHT_M2 = USER_HEIGHT_M ** 2
@@ -52,6 +102,47 @@ HEADER_MAP = {
     "BMI": "bmi",
 }
 
+# 업로드에 실제로 쓰는 컬럼 (_rename_headers 이후 이름). 나머지 컬럼은 읽지 않음
+USED_COLUMNS = frozenset({
+    "date", "time", "weight", "percent_fat", "percent_hydration", "bone_mass",
+    "muscle_mass", "skeletal_muscle_mass", "basal_met", "bmi",
+})
+
+# 인코딩 추정에 사용할 CSV 앞부분 크기
+ENCODING_SAMPLE_BYTES = 32 * 1024
+
+# 숫자 정리: 소수점 쉼표 → '.', 따옴표·'%'·공백 제거 (str.translate 한 번으로 처리)
+NUMBER_CLEAN_TABLE = str.maketrans({",": ".", '"': None, "%": None, " ": None})
+# 내보내기 파일이 쓰는 단위만 제거 (예: "72.5kg", "1650kcal"). lb·kJ 등 다른 단위는 NaN으로 버림
+NUMBER_UNIT_SUFFIX = re.compile(r"(?i)(?:kg|kcal)$")
+
+# 이 크기를 넘는 CSV는 CSV_CHUNK_ROWS 행씩 나눠 읽음 (Parquet 캐시 미사용)
+CSV_STREAM_BYTES = 16 * 1024 * 1024
+CSV_CHUNK_ROWS = 50_000
+
+# 파싱한 CSV를 Parquet로 캐시하고 CSV는 pyarrow 엔진으로 읽음 (pyarrow가 설치된 경우에만)
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# CI(GitHub Actions)는 매 실행 CSV를 새로 받아 캐시가 적중할 일이 없으므로 캐시를 쓰지 않음
+CSV_CACHE_ENABLED = HAS_PYARROW and not os.getenv("CI")
+# 캐시 형식·읽는 컬럼이 바뀌면 올려서 기존 캐시를 무효화
+CSV_CACHE_VERSION = 2
+CSV_CACHE_META_KEY = b"gwu_source"
+
+# CSV 날짜/시간 포맷 ('.'은 '-'로 치환된 뒤 비교). 모두 실패하면 dateutil로 파싱
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+)
+# 단일 값 파싱용: 위 포맷들을 정규식 한 번으로 판별해 필드를 바로 꺼냄 (strptime 예외 반복 없음)
+TIMESTAMP_RE = re.compile(r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?")
+# 벡터 경로에서 경과시간으로 더할 수 있는 24시간제 시각 (캡처 그룹은 시). 나머지(AM/PM 등)는 포맷 목록/dateutil로
+TIME_OF_DAY_RE = re.compile(r"^(\d{1,2}):\d{2}(?::\d{2}(?:\.\d+)?)?$")
+
 BODY_FIELDS = (
     "percent_fat",
     "percent_hydration",
@@ -61,6 +152,11 @@ BODY_FIELDS = (
     "bmi",
 )
 
+# 설치된 garminconnect 버전이 받는 항목만 전송 (시그니처는 import 시 한 번만 확인)
+_ADD_BODY_PARAMS = inspect.signature(Garmin.add_body_composition).parameters
+_FIT_WEIGHT_PARAMS = inspect.signature(FitEncoderWeight.write_weight_scale).parameters
+UPLOAD_FIELDS = tuple(f for f in BODY_FIELDS if f in _ADD_BODY_PARAMS and f in _FIT_WEIGHT_PARAMS)
+
 
 @dataclass
 class BodyRow:
@@ -84,72 +180,172 @@ class BodyRow:
 # ──────────────────────────────────────────────────────────────────────────────
 # 유틸
 # ──────────────────────────────────────────────────────────────────────────────
-def _coerce_float(x) -> float | None:
-    """문자열/숫자를 float로 변환. 빈값/0/에러는 None."""
-    try:
-        s = str(x).strip().replace(",", ".").replace('"', "")
-        if s == "" or s.lower() in {"nan", "none"}:
-            return None
-        v = float(s)
-        return None if v == 0 else v
-    except Exception:
-        return None
-
-
+@lru_cache(maxsize=4096)
 def _parse_timestamp_kst(date_str: str, time_str: str | None) -> datetime:
     s = date_str.strip()
     if time_str and " " not in s and "T" not in s:
         s = f"{s} {time_str.strip()}"
-    s = s.replace(".", "-")
-    dt = dtparser.parse(s)
+    # 날짜 구분자 '.'만 '-'로 (초의 소수점은 유지)
+    s = s[:10].replace(".", "-") + s[10:]
+    try:
+        # ISO 형식(오프셋·소수 초 포함)은 C 구현인 fromisoformat으로 바로 처리
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        m = TIMESTAMP_RE.fullmatch(s)
+        dt = datetime(*(int(g or 0) for g in m.groups())) if m else dtparser.parse(s)
     if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=ZoneInfo("Asia/Seoul"))
+        dt = dt.replace(tzinfo=KST)
     return dt.replace(microsecond=0)
 
 
-def _format_kst_for_display(dt_kst: datetime) -> tuple[str, str]:
-    date_s = dt_kst.strftime("%m/%d/%Y")
-    time_s = dt_kst.strftime("%I:%M %p").lower().lstrip("0")
-    return date_s, time_s
+# ──────────────────────────────────────────────────────────────────────────────
+# CSV 로딩
+# ──────────────────────────────────────────────────────────────────────────────
+def _detect_encoding(path: str) -> str:
+    """파일 앞부분만 읽어 인코딩 추정 (BOM → UTF-8 → CP949)."""
+    with open(path, "rb") as f:
+        sample = f.read(ENCODING_SAMPLE_BYTES)
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # 샘플 끝에서 잘린 멀티바이트 문자는 무시 (final=False)
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp949"
+
+
+def _read_csv(path: str) -> pd.DataFrame:
+    encoding = _detect_encoding(path)
+    try:
+        return _read_csv_fast(path, encoding)
+    except UnicodeDecodeError:
+        if encoding == "cp949":
+            raise
+        return _read_csv_fast(path, "cp949")
 
 
-def _to_utc_iso_z(dt_kst: datetime) -> str:
-    dt_utc = dt_kst.astimezone(ZoneInfo("UTC"))
-    iso = dt_utc.isoformat()
-    if iso.endswith("+00:00"):
-        iso = iso[:-6] + "Z"
-    return iso
+def _read_csv_fast(path: str, encoding: str) -> pd.DataFrame:
+    """pyarrow가 있으면 멀티스레드 pyarrow 엔진으로, 지원하지 않는 입력이면 기본 C 엔진으로 읽는다."""
+    if HAS_PYARROW:
+        try:
+            # pyarrow 엔진은 usecols에 함수를 받지 않으므로 헤더만 먼저 읽어 목록으로 넘김
+            header = pd.read_csv(path, encoding=encoding, nrows=0).columns
+            usecols = [c for c in header if _is_used_column(c)]
+            return pd.read_csv(path, encoding=encoding, engine="pyarrow", usecols=usecols)
+        except ValueError:
+            pass  # ArrowInvalid/디코딩 오류 → C 엔진에서 다시 판단
+    return pd.read_csv(path, encoding=encoding, usecols=_is_used_column)
+
+
+def _is_used_column(name: str) -> bool:
+    return HEADER_MAP.get(name, name.lower()) in USED_COLUMNS
+
+
+def _read_csv_cached(path: str) -> pd.DataFrame:
+    """캐시(.parquet)에 기록된 원본 CSV 정보가 지금과 정확히 같을 때만 캐시를 읽고, 아니면 CSV를 파싱해 캐시를 갱신."""
+    if not CSV_CACHE_ENABLED:
+        return _read_csv(path)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    cache = Path(path).with_suffix(".parquet")
+    key = _csv_cache_key(path)
+    try:
+        if (pq.read_schema(cache).metadata or {}).get(CSV_CACHE_META_KEY) == key:
+            return pq.read_table(cache).to_pandas()
+        # 수정시각만 비교하면 더 오래된 mtime으로 교체된 CSV(압축 해제, cp -p, rsync -t)를 놓침
+        cache.unlink()
+    except FileNotFoundError:
+        pass
+    except Exception:  # noqa: BLE001
+        cache.unlink(missing_ok=True)  # 손상된 캐시 → CSV 재파싱
+
+    df = _read_csv(path)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), CSV_CACHE_META_KEY: key})
+        pq.write_table(table, cache, compression="zstd")
+    except Exception:  # noqa: BLE001
+        pass  # 컬럼 타입이 섞여 있으면 캐시 없이 진행
+    return df
+
+
+def _csv_cache_key(path: str) -> bytes:
+    st = os.stat(path)
+    return json.dumps({
+        "version": CSV_CACHE_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "columns": sorted(USED_COLUMNS),
+    }).encode()
+
+
+def _iter_csv(path: str) -> Iterator[pd.DataFrame]:
+    """큰 CSV는 CSV_CHUNK_ROWS 행씩 나눠 읽어 메모리를 제한하고, 작은 CSV는 한 번에(캐시 사용) 읽는다."""
+    if os.path.getsize(path) <= CSV_STREAM_BYTES:
+        yield _read_csv_cached(path)
+        return
+
+    encoding = _detect_encoding(path)
+    started = False
+    try:
+        for chunk in pd.read_csv(path, encoding=encoding, usecols=_is_used_column, chunksize=CSV_CHUNK_ROWS):
+            started = True
+            yield chunk
+    except UnicodeDecodeError:
+        # 이미 일부 행을 내보냈다면 재시도하면 중복되므로 그대로 실패
+        if started or encoding == "cp949":
+            raise
+        yield from pd.read_csv(path, encoding="cp949", usecols=_is_used_column, chunksize=CSV_CHUNK_ROWS)
 
 
-# ──────────────────────────────────────────────────────────────────────────────
-# CSV 로딩
-# ──────────────────────────────────────────────────────────────────────────────
 def load_rows_from_csv(path: str) -> list[BodyRow]:
-    df = pd.read_csv(path)
+    rows: list[BodyRow] = []
+    for df in _iter_csv(path):
+        rows.extend(_rows_from_frame(df))
+    return rows
+
+
+def _rows_from_frame(df: pd.DataFrame) -> list[BodyRow]:
     df = _rename_headers(df)
     if "date" not in df or "weight" not in df:
         return []
 
-    rows: list[BodyRow] = []
-    for _, r in df.iterrows():
-        date_val = str(r.get("date", "")).strip()
-        time_val = str(r.get("time", "")).strip() if "time" in df else ""
-
-        dt_kst = _parse_timestamp_kst(date_val, time_val if time_val else None)
-        ts_iso_utc = _to_utc_iso_z(dt_kst)
-        date_s_kst, time_s_kst = _format_kst_for_display(dt_kst)
+    # 몸무게가 없거나 0 이하인 행은 타임스탬프 파싱 전에 미리 제외
+    weight_s = _numeric_column(df, "weight")
+    valid = weight_s > 0
+    if not valid.all():
+        df, weight_s = df.loc[valid], weight_s[valid]
+    if df.empty:
+        return []
 
-        weight = _coerce_float(r.get("weight"))
-        if weight is None:
-            continue
+    # 행 단위 파싱 대신 컬럼 단위(벡터)로 한 번에 변환
+    stamps = _parse_timestamps_kst(df)
+    ts_iso_utcs = stamps.dt.tz_convert(UTC).dt.strftime("%Y-%m-%dT%H:%M:%SZ").to_numpy()
+    date_strs_kst = stamps.dt.strftime(DATE_FMT_KST).to_numpy()
+    time_strs_kst = stamps.dt.strftime(TIME_FMT_KST).str.lower().str.lstrip("0").to_numpy()
+    weights = _floats_or_none(weight_s)
+    percent_fats = _float_column(df, "percent_fat")
+    percent_hydrations = _float_column(df, "percent_hydration")
+    bone_masses = _float_column(df, "bone_mass")
+    muscle_masses = _float_column(df, "muscle_mass")
+    skeletal_muscle_masses = _float_column(df, "skeletal_muscle_mass")
+    basal_mets = _float_column(df, "basal_met")
+    bmis = _float_column(df, "bmi")
 
-        src_muscle_mass = _coerce_float(r.get("muscle_mass"))
-        src_skeletal_muscle_mass = _coerce_float(r.get("skeletal_muscle_mass"))
+    rows: list[BodyRow] = []
+    for (
+        ts_iso_utc, date_s_kst, time_s_kst, weight, percent_fat, percent_hydration,
+        bone_mass, src_muscle_mass, src_skeletal_muscle_mass, basal_met, bmi_csv,
+    ) in zip(
+        ts_iso_utcs, date_strs_kst, time_strs_kst, weights, percent_fats, percent_hydrations,
+        bone_masses, muscle_masses, skeletal_muscle_masses, basal_mets, bmis,
+    ):
         muscle_mass = src_skeletal_muscle_mass if src_skeletal_muscle_mass is not None else src_muscle_mass
-
-        bmi_csv = _coerce_float(r.get("bmi"))
-        bmi_auto = round(weight / USER_HEIGHT_M2, 1) if weight is not None else None
-        bmi = bmi_csv if bmi_csv is not None else bmi_auto
+        bmi = bmi_csv if bmi_csv is not None else round(weight / USER_HEIGHT_M2, 1)
 
         rows.append(
             BodyRow(
@@ -157,11 +353,11 @@ def load_rows_from_csv(path: str) -> list[BodyRow]:
                 date_str_kst=date_s_kst,
                 time_str_kst=time_s_kst,
                 weight=weight,
-                percent_fat=_coerce_float(r.get("percent_fat")),
-                percent_hydration=_coerce_float(r.get("percent_hydration")),
-                bone_mass=_coerce_float(r.get("bone_mass")),
+                percent_fat=percent_fat,
+                percent_hydration=percent_hydration,
+                bone_mass=bone_mass,
                 muscle_mass=muscle_mass,
-                basal_met=_coerce_float(r.get("basal_met")),
+                basal_met=basal_met,
                 bmi=bmi,
                 src_muscle_mass=src_muscle_mass,
                 src_skeletal_muscle_mass=src_skeletal_muscle_mass,
@@ -170,6 +366,91 @@ def load_rows_from_csv(path: str) -> list[BodyRow]:
     return rows
 
 
+def _float_column(df: pd.DataFrame, col: str) -> list[float | None]:
+    """컬럼 전체를 float 리스트로 변환. 컬럼이 없거나 빈값/0/에러는 None."""
+    if col not in df:
+        return [None] * len(df)
+    return _floats_or_none(_numeric_column(df, col))
+
+
+def _numeric_column(df: pd.DataFrame, col: str) -> pd.Series:
+    """컬럼을 float Series로 변환. 변환 실패는 NaN."""
+    if pd.api.types.is_numeric_dtype(df[col]):
+        # 이미 숫자 컬럼이면 문자열 변환 없이 그대로 사용
+        return df[col].astype(float)
+    s = (
+        df[col]
+        .astype(str)
+        .str.translate(NUMBER_CLEAN_TABLE)
+        .str.replace(NUMBER_UNIT_SUFFIX, "", regex=True)
+        .str.strip()
+    )
+    return pd.to_numeric(s, errors="coerce")
+
+
+def _floats_or_none(v: pd.Series) -> list[float | None]:
+    v = v.where(v != 0)
+    # tolist()가 파이썬 float로 바꿔 주므로 NaN만 자기 자신과 다름(x != x)으로 걸러냄
+    return [None if x != x else x for x in v.to_numpy(dtype=float).tolist()]
+
+
+def _parse_timestamps_kst(df: pd.DataFrame) -> pd.Series:
+    """date/time 컬럼을 한 번에 KST aware 타임스탬프로 변환. 실패한 행만 dateutil로 재시도."""
+    if "time" in df:
+        time_s = df["time"].fillna("").astype(str).str.strip()
+    else:
+        time_s = pd.Series("", index=df.index)
+    # "8:30 PM"·"25:00"을 to_timedelta에 넘기면 PM을 버리거나 다음 날로 넘어가므로 NaN으로 두어 재시도 경로로 보냄
+    hour = pd.to_numeric(time_s.str.extract(TIME_OF_DAY_RE)[0], errors="coerce")
+    time_norm = (
+        time_s.where(time_s.str.count(":") != 1, time_s + ":00").where(hour < 24).where(time_s != "", "00:00:00")
+    )
+
+    dates = df["date"]
+    date_only = dates.dtype == object and pd.api.types.infer_dtype(dates, skipna=True) == "date"
+    if date_only:
+        # pyarrow 엔진은 날짜만 있는 ISO 값을 datetime.date 객체로 돌려준다 → 시간 컬럼을 더함
+        dates = pd.to_datetime(dates)
+    if pd.api.types.is_datetime64_any_dtype(dates) and dates.notna().all():
+        # 이미 datetime 컬럼이면 문자열 파싱 생략
+        if dates.dt.tz is not None:
+            return dates.dt.tz_convert(KST).dt.floor("s")
+        if not date_only:
+            # 원본 값에 시각이 포함돼 있음 → 문자열 경로와 같이 시간 컬럼은 무시 (자정 값 포함)
+            return dates.dt.tz_localize(KST).dt.floor("s")
+        offset = pd.to_timedelta(time_norm, errors="coerce")
+        if offset.notna().all():
+            return (dates + offset).dt.tz_localize(KST).dt.floor("s")
+
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        # astype(str)은 전부 자정이면 시각을 생략해 결과가 데이터에 따라 달라지므로 형식을 고정
+        date_s = dates.dt.strftime("%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S").fillna("")
+    else:
+        date_s = dates.fillna("").astype(str).str.strip()
+    date_only = ~date_s.str.contains(r"[ T]", regex=True)
+    has_time = (time_s != "") & date_only
+    combined = date_s.where(~has_time, date_s + " " + time_s).str.replace(".", "-", regex=False)
+
+    # 날짜와 시간을 따로 파싱해 더한다 (날짜 + 하루 중 경과시간)
+    date_part = pd.to_datetime(
+        date_s.where(date_only).str.replace(".", "-", regex=False), format="%Y-%m-%d", errors="coerce"
+    )
+    parsed = (date_part + pd.to_timedelta(time_norm, errors="coerce")).astype("datetime64[ns]")
+
+    # 날짜에 시간이 포함돼 있거나 위에서 실패한 행은 합친 문자열을 포맷 목록으로 재시도
+    for fmt in TIMESTAMP_FORMATS:
+        todo = parsed.isna()
+        if not todo.any():
+            break
+        parsed[todo] = pd.to_datetime(combined[todo], format=fmt, errors="coerce")
+    parsed = parsed.dt.tz_localize(KST).dt.floor("s")
+
+    for idx in parsed.index[parsed.isna()]:
+        dt = _parse_timestamp_kst(date_s[idx], time_s[idx] or None)
+        parsed[idx] = pd.Timestamp(dt).tz_convert(KST)
+    return parsed
+
+
 def _rename_headers(df: pd.DataFrame) -> pd.DataFrame:
     new_cols = {}
     for c in df.columns:
@@ -190,25 +471,26 @@ def login(email: str | None, password: str | None) -> Garmin:
     try:
         api = Garmin()
         api.login(TOKEN_DIR)
-        print("✅ 저장된 토큰으로 로그인 성공")
+        logger.info("✅ 저장된 토큰으로 로그인 성공")
         return api
     except GarminConnectTooManyRequestsError as e:
         sys.exit(f"❌ Rate limit: {e}")
     except Exception as e:  # noqa: BLE001
-        print(f"ℹ️  저장된 토큰 없음 또는 만료 ({e}) → 새 로그인 시도")
+        logger.info("ℹ️  저장된 토큰 없음 또는 만료 (%s) → 새 로그인 시도", e)
 
     # 2) 새 로그인
     if not email or not password:
         sys.exit("❌ GARMIN_EMAIL / GARMIN_PASSWORD 필요")
 
     try:
-        api = Garmin(
-            email=email,
-            password=password,
-            prompt_mfa=lambda: input("MFA 코드 입력: ").strip(),
-        )
+        api = Garmin()
+        # api.login()은 GARMINTOKENS가 설정돼 있으면 비밀번호 대신 토큰만 다시 읽으므로
+        # 자격 증명 로그인은 garth로 직접 하고, 저장한 토큰으로 프로필/설정을 불러옴
+        api.garth.login(email, password, prompt_mfa=lambda: input("MFA 코드 입력: ").strip())
+        # 다음 실행부터는 SSO 없이 토큰 복원만 하도록 저장
+        api.garth.dump(TOKEN_DIR)
         api.login(TOKEN_DIR)
-        print(f"✅ 새 로그인 성공 (토큰 저장: {TOKEN_DIR})")
+        logger.info("✅ 새 로그인 성공 (토큰 저장: %s)", TOKEN_DIR)
         return api
     except GarminConnectTooManyRequestsError as e:
         sys.exit(f"❌ Rate limit: {e}")
@@ -216,45 +498,269 @@ def login(email: str | None, password: str | None) -> Garmin:
         sys.exit("❌ 이메일/비번 오류 — 환경변수 확인")
     except GarminConnectConnectionError as e:
         sys.exit(f"❌ 연결 오류: {e}")
+    except (GarthException, RequestException) as e:
+        # garth.login()은 GarminConnect* 예외로 감싸지 않고 그대로 올림
+        status = _http_status(e)
+        if status == 429:
+            sys.exit(f"❌ Rate limit: {e}")
+        if status in (401, 403):
+            sys.exit("❌ 이메일/비번 오류 — 환경변수 확인")
+        sys.exit(f"❌ 연결 오류: {e}")
+
+
+class _UploadRetry(Retry):
+    """urllib3 기본값은 POST를 재시도하지 않으므로 POST_RETRY_STATUS 응답에 한해 허용."""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method == "POST":
+            return bool(self.total) and status_code in POST_RETRY_STATUS
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def _configure_upload_retry(api: Garmin) -> None:
+    """garth 세션의 어댑터를 _UploadRetry로 교체. 커넥션 풀 설정은 garth 값을 그대로 유지."""
+    client = api.garth
+    retry = _UploadRetry(
+        total=client.retries,
+        status_forcelist=client.status_forcelist,
+        backoff_factor=client.backoff_factor,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        backoff_max=HTTP_BACKOFF_MAX,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=client.pool_connections,
+        pool_maxsize=client.pool_maxsize,
+    )
+    client.sess.mount("https://", adapter)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 업로드
 # ──────────────────────────────────────────────────────────────────────────────
+def _body_payload(row: BodyRow) -> dict[str, float]:
+    payload = {"weight": row.weight}
+    for f in UPLOAD_FIELDS:
+        v = getattr(row, f)
+        if v is not None:
+            payload[f] = v
+    return payload
+
+
+def _encode_batch(batch: list[BodyRow]) -> bytes:
+    """여러 측정값을 weight_scale 레코드로 묶은 FIT 파일 하나로 인코딩."""
+    stamps = [datetime.fromisoformat(row.ts_iso_utc) for row in batch]
+    encoder = FitEncoderWeight()
+    encoder.write_file_info()
+    encoder.write_file_creator()
+    encoder.write_device_info(stamps[0])
+    for dt, row in zip(stamps, batch):
+        encoder.write_weight_scale(dt, **_body_payload(row))
+    encoder.finish()
+    return encoder.getvalue()
+
+
+def _upload_batch(api: Garmin, fit: bytes) -> None:
+    """인코딩된 FIT 파일을 업로드 (요청 1회)."""
+    files = {"file": ("body_composition.fit", fit)}
+    api.garth.post("connectapi", api.garmin_connect_upload, files=files, api=True)
+
+
+def load_uploaded_keys(path: Path) -> set[tuple[str, str, float]]:
+    """이전 실행에서 업로드한 (날짜, 시간, 체중) 키 목록. 파일이 없거나 깨졌으면 빈 집합."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return set()
+    return {(d, t, float(w)) for d, t, w in data}
+
+
+def save_uploaded_keys(path: Path, keys: set[tuple[str, str, float]]) -> None:
+    """임시 파일에 쓴 뒤 교체해, 저장 중에 중단돼도 기존 기록이 깨지지 않도록 한다."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(sorted(keys), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def fetch_existing_keys(api: Garmin, rows: list[BodyRow]) -> set[tuple[str, str, float]]:
+    """rows 날짜 범위에서 Garmin에 이미 있는 측정값의 중복 키 (조회 1회). 실패하면 빈 집합."""
+    # ts_iso_utc는 고정 폭 UTC 문자열이라 문자열 비교가 곧 시간순 → 양 끝 두 개만 파싱
+    stamps = [row.ts_iso_utc for row in rows]
+    start, end = (datetime.fromisoformat(ts).astimezone(KST).date() for ts in (min(stamps), max(stamps)))
+    try:
+        data = api.get_weigh_ins(start.isoformat(), end.isoformat())
+    except Exception as e:  # noqa: BLE001
+        logger.warning("⚠️  기존 체중 기록 조회 실패 → 중복 확인 없이 진행: %s", e)
+        return set()
+
+    keys: set[tuple[str, str, float]] = set()
+    for summary in (data or {}).get("dailyWeightSummaries") or []:
+        for metric in summary.get("allWeightMetrics") or []:
+            ts_ms, grams = metric.get("timestampGMT"), metric.get("weight")
+            if ts_ms is None or grams is None:
+                continue
+            dt = datetime.fromtimestamp(ts_ms / 1000, KST)
+            time_s = dt.strftime(TIME_FMT_KST).lower().lstrip("0")
+            keys.add((dt.strftime(DATE_FMT_KST), time_s, round(grams / 1000, 2)))
+    return keys
+
+
 def upload_rows(api: Garmin, rows: list[BodyRow], dry_run: bool, skip_duplicates: bool) -> None:
     seen: set[tuple[str, str, float]] = set()
+    uploaded = load_uploaded_keys(STATE_FILE) if skip_duplicates else set()
+    pending: list[BodyRow] = []
+    debug = logger.isEnabledFor(logging.DEBUG)
 
     for row in rows:
         k = row.dup_key()
         if skip_duplicates and k in seen:
-            print(f"⏭️  {row.date_str_kst} {row.time_str_kst} {row.weight}kg → 중복 스킵")
+            logger.debug("⏭️  %s %s %skg → 중복 스킵", row.date_str_kst, row.time_str_kst, row.weight)
             continue
         seen.add(k)
-
-        mm_src = (
-            "골격근량" if row.src_skeletal_muscle_mass is not None
-            else ("근육량" if row.src_muscle_mass is not None else "없음")
-        )
-        print(
-            f"➡️ {row.date_str_kst} {row.time_str_kst}  {row.weight}kg  "
-            f"(muscle_mass: {row.muscle_mass} [{mm_src}], BMI: {row.bmi}) → {row.ts_iso_utc}"
-        )
-
-        if dry_run:
+        if k in uploaded:
+            logger.debug("⏭️  %s %s %skg → 이미 업로드됨", row.date_str_kst, row.time_str_kst, row.weight)
             continue
 
+        if debug:
+            mm_src = (
+                "골격근량" if row.src_skeletal_muscle_mass is not None
+                else ("근육량" if row.src_muscle_mass is not None else "없음")
+            )
+            logger.debug(
+                "➡️ %s %s  %skg  (muscle_mass: %s [%s], BMI: %s) → %s",
+                row.date_str_kst, row.time_str_kst, row.weight,
+                row.muscle_mass, mm_src, row.bmi, row.ts_iso_utc,
+            )
+        pending.append(row)
+
+    if skip_duplicates and pending:
+        existing = fetch_existing_keys(api, pending)
+        pending = [row for row in pending if row.dup_key() not in existing]
+
+    logger.info("업로드 대상 %d건 (스킵 %d건)", len(pending), len(rows) - len(pending))
+    if dry_run:
+        return
+
+    batches = [pending[i:i + UPLOAD_BATCH_SIZE] for i in range(0, len(pending), UPLOAD_BATCH_SIZE)]
+    # 배치는 서로 독립이므로 스레드 풀로 동시에 업로드 (세션 커넥션 풀을 공유)
+    success = existing_count = 0
+    # 일괄 업로드가 확실히 거부(4xx)되면 이후 배치는 바로 건별 업로드 (실패할 요청 반복 방지)
+    batch_rejected = threading.Event()
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        # 첫 배치가 끝난 뒤 나머지를 제출: 일괄 업로드가 거부되면 나머지는 처음부터 건별 업로드
+        futures = [pool.submit(_upload_batch_or_rows, api, batch, batch_rejected) for batch in batches[:1]]
+        wait(futures)
+        futures += [pool.submit(_upload_batch_or_rows, api, batch, batch_rejected) for batch in batches[1:]]
+        for fut in as_completed(futures):
+            done, existing = fut.result()
+            success += len(done)
+            existing_count += len(existing)
+            uploaded.update(row.dup_key() for row in done + existing)
+            if skip_duplicates:
+                # 배치마다 저장해 중간에 실패해도 다음 실행에서 재업로드하지 않도록
+                save_uploaded_keys(STATE_FILE, uploaded)
+
+    logger.info(
+        "📊 업로드 %d건 성공 / %d건 이미 있음 / %d건 실패 / %d건 스킵 (배치 %d개)",
+        success, existing_count, len(pending) - success - existing_count,
+        len(rows) - len(pending), len(batches),
+    )
+
+
+def _upload_batch_or_rows(
+    api: Garmin, batch: list[BodyRow], batch_rejected: threading.Event
+) -> tuple[list[BodyRow], list[BodyRow]]:
+    """배치를 한 번에 업로드하고, 거부되면 건별로 업로드. (업로드 성공, 이미 있던) 행을 반환."""
+    if not batch_rejected.is_set():
+        try:
+            # 요청 전에 인코딩 → 여기서 실패하면(값 범위 초과 등) 아무것도 전송되지 않았으므로 건별 업로드
+            fit = _encode_batch(batch)
+        except Exception as e:
+            logger.warning("   ⚠️  FIT 인코딩 실패 (%s) → 건별 업로드로 재시도", e)
+        else:
+            try:
+                _upload_batch(api, fit)
+                logger.info("   ✅ %d건 일괄 업로드 성공", len(batch))
+                return batch, []
+            except Exception as e:
+                if _is_duplicate_upload(e):
+                    # 같은 FIT 파일을 이미 올린 적 있음 → 배치 전체가 이미 업로드된 상태
+                    logger.info("   ⏭️  %d건 이미 업로드됨 (409)", len(batch))
+                    return [], batch
+                if not _is_batch_rejected(e):
+                    # 429/5xx/타임아웃은 서버가 이미 저장했을 수 있어 건별 재업로드하면 중복 기록
+                    # → 실패로 두고 키를 저장하지 않아 다음 실행에서 다시 시도
+                    logger.error("   ❌ %d건 일괄 업로드 실패 (%s) → 다음 실행에서 재시도", len(batch), e)
+                    return [], []
+                batch_rejected.set()
+                logger.warning("   ⚠️  일괄 업로드 거부 (%s) → 건별 업로드로 재시도", e)
+
+    done: list[BodyRow] = []
+    existing: list[BodyRow] = []
+    for row in batch:
         try:
-            payload = {"weight": row.weight}
-            for f in BODY_FIELDS:
-                v = getattr(row, f)
-                if v is not None:
-                    payload[f] = v
-            api.add_body_composition(row.ts_iso_utc, **payload)
-            print("   ✅ 성공")
+            api.add_body_composition(row.ts_iso_utc, **_body_payload(row))
+            logger.debug("   ✅ %s %s 성공", row.date_str_kst, row.time_str_kst)
+            done.append(row)
+        except json.JSONDecodeError:
+            # 업로드는 됐지만 응답 본문이 비어 .json()만 실패한 경우
+            logger.debug("   ✅ %s %s 성공 (빈 응답)", row.date_str_kst, row.time_str_kst)
+            done.append(row)
         except Exception as e:
-            print(f"   ❌ 실패: {e}")
+            if _is_duplicate_upload(e):
+                logger.debug("   ⏭️  %s %s 이미 업로드됨 (409)", row.date_str_kst, row.time_str_kst)
+                existing.append(row)
+            else:
+                logger.error("   ❌ %s %s 실패: %s", row.date_str_kst, row.time_str_kst, e)
 
         time.sleep(0.3)
+    return done, existing
+
+
+def _is_duplicate_upload(e: Exception) -> bool:
+    return _http_status(e) == HTTP_CONFLICT
+
+
+def _is_batch_rejected(e: Exception) -> bool:
+    """Garmin이 배치를 확실히 거부했는지 (4xx, 단 BATCH_NOT_REJECTED_STATUS 제외)."""
+    status = _http_status(e)
+    return status is not None and 400 <= status < 500 and status not in BATCH_NOT_REJECTED_STATUS
+
+
+def _http_status(e: Exception) -> int | None:
+    response = e.error.response if isinstance(e, GarthHTTPError) else None
+    return None if response is None else response.status_code
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CSV 탐색
+# ──────────────────────────────────────────────────────────────────────────────
+def find_csv_files(patterns: list[str]) -> list[str]:
+    """패턴에 맞는 CSV를 디렉터리당 scandir 한 번으로 찾아 수정시각 순으로 반환."""
+    by_dir: dict[str, list[str]] = {}
+    found: dict[str, float] = {}
+    for pat in patterns:
+        dirname, basename = os.path.split(pat)
+        if glob.has_magic(dirname):
+            # 디렉터리 부분에 와일드카드가 있으면 glob에 맡긴다
+            for p in glob.glob(pat):
+                found[p] = os.stat(p).st_mtime
+            continue
+        by_dir.setdefault(dirname, []).append(basename)
+
+    for dirname, names in by_dir.items():
+        try:
+            with os.scandir(dirname or ".") as it:
+                for entry in it:
+                    if any(fnmatch.fnmatch(entry.name, n) for n in names) and entry.is_file():
+                        # DirEntry.stat()은 결과를 캐시하므로 추가 syscall 없이 재사용
+                        found[os.path.join(dirname, entry.name)] = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+
+    return sorted(found, key=found.__getitem__)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -269,23 +775,30 @@ def main():
     ap.add_argument("--no-skip-duplicates", action="store_true")
     args = ap.parse_args()
 
-    targets: list[str] = []
-    for pat in args.csv:
-        targets.extend(glob.glob(pat))
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s", stream=sys.stdout
+    )
+
+    targets = find_csv_files(args.csv)
     if not targets:
         sys.exit("CSV 파일을 찾을 수 없습니다.")
 
-    print("📄 처리 대상 CSV:")
+    logger.info("📄 처리 대상 CSV:")
     for t in targets:
-        print(" -", t)
+        logger.info(" - %s", t)
+
+    # 로그인(네트워크 대기)은 별도 스레드에서, CSV 파싱은 메인 스레드에서 동시에 진행
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        login_future = pool.submit(login, args.email, args.password)
 
-    api = login(args.email, args.password)
+        all_rows: list[BodyRow] = []
+        for path in targets:
+            all_rows.extend(load_rows_from_csv(path))
 
-    all_rows: list[BodyRow] = []
-    for path in targets:
-        all_rows.extend(load_rows_from_csv(path))
+        api = login_future.result()
+    _configure_upload_retry(api)
 
-    print(f"총 {len(all_rows)}개 레코드 로드됨")
+    logger.info("총 %d개 레코드 로드됨", len(all_rows))
     upload_rows(api, all_rows, args.dry_run, skip_duplicates=not args.no_skip_duplicates)
 
 
@@ -0,0 +1,34 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import GWU
+
+
+@pytest.mark.parametrize(
+    "date",
+    ["2024.01.05", "2024-01-05", datetime.date(2024, 1, 5)],
+)
+@pytest.mark.parametrize(
+    ("time", "expected"),
+    [
+        ("8:30 PM", "2024-01-05 20:30:00"),
+        ("08:30:00 PM", "2024-01-05 20:30:00"),
+        ("12:15 AM", "2024-01-05 00:15:00"),
+        ("20:30", "2024-01-05 20:30:00"),
+        ("7:05:09.5", "2024-01-05 07:05:09"),
+        ("", "2024-01-05 00:00:00"),
+    ],
+)
+def test_parse_timestamps_kst_time_column(date: object, time: str, expected: str) -> None:
+    df = pd.DataFrame({"date": [date], "time": [time]})
+    parsed = GWU._parse_timestamps_kst(df)
+    assert parsed[0] == pd.Timestamp(expected, tz=GWU.KST)
+
+
+@pytest.mark.parametrize("time", ["25:00:00", "24:00"])
+def test_parse_timestamps_kst_rejects_out_of_range_time(time: str) -> None:
+    df = pd.DataFrame({"date": ["2024-01-05"], "time": [time]})
+    with pytest.raises(ValueError):
+        GWU._parse_timestamps_kst(df)